@@ -0,0 +1,127 @@
+// RapydShare offline cache.
+//
+// - /api/files   stale-while-revalidate: answer from cache instantly, revalidate with the
+//                listing's ETag (usually a bodiless 304) and tell the page if it changed.
+// - /api/thumb   cache-first for versioned (?v=) URLs, which never change.
+//
+// Each cache is bounded by bytes; the oldest-written entries are dropped first.
+
+const LISTING_CACHE = 'rapydshare-listings-v1';
+const THUMB_CACHE = 'rapydshare-thumbs-v1';
+const CACHE_LIMITS = {
+  [LISTING_CACHE]: 5 * 1024 * 1024,
+  [THUMB_CACHE]: 60 * 1024 * 1024,
+};
+const trimTimers = {};
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names
+      .filter(name => name.startsWith('rapydshare-') && !(name in CACHE_LIMITS))
+      .map(name => caches.delete(name)));
+    await self.clients.claim();
+  })());
+});
+
+self.addEventListener('fetch', (event) => {
+  const { request } = event;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (url.pathname === '/api/files') {
+    event.respondWith(staleWhileRevalidate(event));
+  } else if (url.pathname === '/api/thumb' && url.searchParams.has('v')) {
+    event.respondWith(cacheFirst(request));
+  }
+});
+
+async function staleWhileRevalidate(event) {
+  const { request } = event;
+  const cache = await caches.open(LISTING_CACHE);
+  const cached = await cache.match(request);
+
+  const revalidate = (async () => {
+    const headers = new Headers(request.headers);
+    const etag = cached?.headers.get('ETag');
+    if (etag) headers.set('If-None-Match', etag);
+    const res = await fetch(request.url, { headers, credentials: 'same-origin', cache: 'no-store' });
+
+    if (res.status === 304 && cached) {
+      await store(LISTING_CACHE, request, cached.clone());
+      return cached;
+    }
+    if (!res.ok) return res;
+
+    await store(LISTING_CACHE, request, res.clone());
+    if (cached) await notifyListingChanged(request.url, await res.clone().json());
+    return res;
+  })();
+
+  if (cached) {
+    event.waitUntil(revalidate.catch(() => undefined));
+    return cached.clone();
+  }
+  return revalidate;
+}
+
+async function cacheFirst(request) {
+  const cache = await caches.open(THUMB_CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+
+  const res = await fetch(request);
+  if (res.ok) await store(THUMB_CACHE, request, res.clone());
+  return res;
+}
+
+async function notifyListingChanged(url, items) {
+  const clients = await self.clients.matchAll({ type: 'window' });
+  clients.forEach(client => client.postMessage({ type: 'listing-updated', url, items }));
+}
+
+// --- Bounded storage ---
+
+async function store(cacheName, request, response) {
+  const body = await response.blob();
+  const headers = new Headers(response.headers);
+  headers.set('X-SW-Size', String(body.size));
+  headers.set('X-SW-Time', String(Date.now()));
+  const cache = await caches.open(cacheName);
+  await cache.put(request, new Response(body, { status: response.status, statusText: response.statusText, headers }));
+
+  if (!trimTimers[cacheName]) {
+    trimTimers[cacheName] = setTimeout(() => {
+      trimTimers[cacheName] = null;
+      trim(cacheName).catch(() => undefined);
+    }, 2000);
+  }
+}
+
+async function trim(cacheName) {
+  const limit = CACHE_LIMITS[cacheName];
+  const cache = await caches.open(cacheName);
+  const keys = await cache.keys();
+  const entries = await Promise.all(keys.map(async (key) => {
+    const res = await cache.match(key);
+    return {
+      key,
+      size: Number(res?.headers.get('X-SW-Size') || 0),
+      time: Number(res?.headers.get('X-SW-Time') || 0),
+    };
+  }));
+
+  let total = entries.reduce((sum, e) => sum + e.size, 0);
+  if (total <= limit) return;
+
+  // Trim to 90% so we don't do this again on the very next write
+  entries.sort((a, b) => a.time - b.time);
+  for (const entry of entries) {
+    if (total <= limit * 0.9) break;
+    await cache.delete(entry.key);
+    total -= entry.size;
+  }
+}
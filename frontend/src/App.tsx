@@ -3,7 +3,7 @@ import type { FileItem, UploadTask } from './types';
 import { FileCard } from './components/FileCard';
 import { PreviewModal } from './components/PreviewModal';
 import { UploadManager } from './components/UploadManager';
-import { ArrowLeft, Search, Moon, Sun, LayoutGrid, List, RefreshCw, FolderOpen, Upload } from 'lucide-react';
+import { ArrowLeft, Search, Moon, Sun, LayoutGrid, List, RefreshCw, FolderOpen, Upload, ListChecks, Download, X } from 'lucide-react';
 import { clsx } from 'clsx';
 
 function App() {
@@ -17,8 +17,13 @@ function App() {
   const [uploadEnabled, setUploadEnabled] = useState(false);
   const [tasks, setTasks] = useState<UploadTask[]>([]);
   const [isDragging, setIsDragging] = useState(false);
+  const [selectMode, setSelectMode] = useState(false);
+  const [selected, setSelected] = useState<Set<string>>(new Set());
+  const [archiveFormats, setArchiveFormats] = useState<string[]>(['zip']);
+  const [archiveRoot, setArchiveRoot] = useState<string | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
   const dragCounter = useRef(0);
+  const currentPathRef = useRef('');
 
   // --- Initialization ---
   useEffect(() => {
@@ -37,8 +42,20 @@ function App() {
 
     fetch('/api/server_info')
       .then(res => res.ok ? res.json() : Promise.reject(res.status))
-      .then(info => setUploadEnabled(!!info.allow_upload))
+      .then(info => {
+        setUploadEnabled(!!info.allow_upload);
+        if (info.archive_formats) setArchiveFormats(info.archive_formats);
+      })
       .catch(() => setUploadEnabled(false));
+
+    // The service worker answers listings from cache, then posts the fresh copy if it changed
+    const onWorkerMessage = (e: MessageEvent) => {
+      if (e.data?.type !== 'listing-updated') return;
+      const path = new URL(e.data.url).searchParams.get('path') ?? '';
+      if (path === currentPathRef.current) setItems(e.data.items);
+    };
+    navigator.serviceWorker?.addEventListener('message', onWorkerMessage);
+    return () => navigator.serviceWorker?.removeEventListener('message', onWorkerMessage);
   }, []);
 
   // --- Actions ---
@@ -67,7 +84,9 @@ function App() {
       if (!res.ok) throw new Error('Failed to load');
       const data = await res.json();
       setItems(data);
+      if (path !== currentPathRef.current) setSelected(new Set());
       setCurrentPath(path);
+      currentPathRef.current = path;
       window.scrollTo(0, 0);
     } catch (err) {
       console.error(err);
@@ -89,8 +108,51 @@ function App() {
     window.location.href = `${endpoint}?path=${encodeURIComponent(item.path)}`;
   };
 
+  // Folders inside an archive are virtual; only their files can be downloaded, one at a time
+  const inArchive = archiveRoot !== null && (currentPath === archiveRoot || currentPath.startsWith(archiveRoot + '/'));
+
+  // --- Multi-select ---
+  const toggleSelectMode = () => {
+    setSelectMode(!selectMode);
+    setSelected(new Set());
+  };
+
+  const toggleSelected = (path: string) => {
+    setSelected(prev => {
+      const next = new Set(prev);
+      if (next.has(path)) next.delete(path); else next.add(path);
+      return next;
+    });
+  };
+
+  // Form POST so the browser streams the archive straight into a download
+  const downloadSelection = (format: string) => {
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/api/download_selection';
+    form.style.display = 'none';
+    const addField = (name: string, value: string) => {
+      const input = document.createElement('input');
+      input.type = 'hidden';
+      input.name = name;
+      input.value = value;
+      form.appendChild(input);
+    };
+    selected.forEach(path => addField('paths', path));
+    addField('format', format);
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+  };
+
   const handleCardClick = (item: FileItem) => {
-    if (item.is_dir) {
+    if (selectMode && !inArchive) {
+      toggleSelected(item.path);
+      return;
+    }
+    // Archives are browsed like folders
+    if (item.type === 'archive') setArchiveRoot(item.path);
+    if (item.is_dir || item.type === 'archive') {
       fetchFiles(item.path);
     } else {
       setPreviewItem(item);
@@ -261,6 +323,18 @@ function App() {
               />
             </div>
             
+            {!inArchive && (
+              <button
+                onClick={toggleSelectMode}
+                className={clsx(
+                  "p-2 rounded-lg transition-colors",
+                  selectMode ? "bg-blue-600 text-white" : "text-gray-600 dark:text-gray-300 hover:bg-gray-100 dark:hover:bg-gray-800"
+                )}
+              >
+                <ListChecks size={20} />
+              </button>
+            )}
+
             <button onClick={toggleView} className="p-2 rounded-lg text-gray-600 dark:text-gray-300 hover:bg-gray-100 dark:hover:bg-gray-800 transition-colors">
               {viewMode === 'grid' ? <List size={20} /> : <LayoutGrid size={20} />}
             </button>
@@ -324,11 +398,40 @@ function App() {
               viewMode={viewMode}
               onClick={handleCardClick}
               onDownload={handleDownload}
+              downloadable={!(inArchive && item.is_dir)}
+              selectable={selectMode && !inArchive}
+              selected={selected.has(item.path)}
             />
           ))}
         </div>
       </main>
 
+      {/* --- SELECTION BAR --- */}
+      {selectMode && !inArchive && (
+        <div className="fixed bottom-4 left-1/2 -translate-x-1/2 z-40 flex items-center gap-2 bg-gray-900 text-white rounded-full shadow-xl pl-4 pr-2 py-2 text-sm">
+          <span className="font-medium whitespace-nowrap">{selected.size} selected</span>
+          <button
+            onClick={() => setSelected(new Set(filteredItems.map(item => item.path)))}
+            className="px-3 py-1.5 rounded-full hover:bg-white/10 transition-colors whitespace-nowrap"
+          >
+            All
+          </button>
+          {archiveFormats.map(format => (
+            <button
+              key={format}
+              disabled={selected.size === 0}
+              onClick={() => downloadSelection(format)}
+              className="flex items-center gap-1.5 px-3 py-1.5 rounded-full bg-blue-600 hover:bg-blue-700 disabled:opacity-40 disabled:cursor-not-allowed transition-colors whitespace-nowrap"
+            >
+              <Download size={16} /> .{format}
+            </button>
+          ))}
+          <button onClick={toggleSelectMode} className="p-1.5 rounded-full hover:bg-white/10 transition-colors">
+            <X size={16} />
+          </button>
+        </div>
+      )}
+
       {/* --- PREVIEW MODAL --- */}
       {previewItem && (
         <PreviewModal
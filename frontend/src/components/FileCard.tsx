@@ -1,7 +1,7 @@
 import React from 'react';
 import type { FileItem } from '../types';
 // FIX: Removed 'Image as ImageIcon' from imports
-import { Folder, FileText, Film, Download } from 'lucide-react';
+import { Folder, FileText, FileArchive, Film, Download, Check } from 'lucide-react';
 import { clsx } from 'clsx';
 
 interface FileCardProps {
@@ -9,9 +9,12 @@ interface FileCardProps {
     viewMode: 'grid' | 'list';
     onClick: (item: FileItem) => void;
     onDownload: (item: FileItem, e: React.MouseEvent) => void;
+    downloadable?: boolean;
+    selectable?: boolean;
+    selected?: boolean;
 }
 
-export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onDownload }) => {
+export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onDownload, downloadable = true, selectable = false, selected = false }) => {
     
     const formatSize = (bytes: number) => {
         if (bytes === 0) return '0 B';
@@ -21,7 +24,8 @@ export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onD
         return parseFloat((bytes / Math.pow(k, i)).toFixed(1)) + ' ' + sizes[i];
     };
 
-    const getThumbUrl = (path: string) => `/api/thumb?path=${encodeURIComponent(path)}`;
+    // `v` changes whenever the file does, so thumbnails can be cached forever
+    const getThumbUrl = (path: string) => `/api/thumb?path=${encodeURIComponent(path)}&v=${item.size}-${item.mtime}`;
 
     const renderIcon = () => {
         if (item.is_dir) return <Folder className="w-full h-full text-yellow-400 fill-yellow-400" />;
@@ -35,15 +39,29 @@ export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onD
                 />
             );
         }
+        if (item.type === 'archive') return <FileArchive className="w-12 h-12 text-amber-500" />;
         return <FileText className="w-12 h-12 text-gray-400" />;
     };
 
+    const renderCheck = () => (
+        <div className={clsx(
+            "w-5 h-5 flex-shrink-0 rounded-md border-2 flex items-center justify-center transition-colors",
+            selected ? "bg-blue-600 border-blue-600 text-white" : "bg-white/80 dark:bg-gray-900/80 border-gray-300 dark:border-gray-600"
+        )}>
+            {selected && <Check size={14} strokeWidth={3} />}
+        </div>
+    );
+
     if (viewMode === 'list') {
         return (
             <div 
                 onClick={() => onClick(item)}
-                className="group flex items-center p-3 bg-white dark:bg-gray-900 border border-gray-200 dark:border-gray-800 rounded-xl hover:shadow-md transition-all cursor-pointer active:scale-[0.99]"
+                className={clsx(
+                    "group flex items-center p-3 bg-white dark:bg-gray-900 border rounded-xl hover:shadow-md transition-all cursor-pointer active:scale-[0.99]",
+                    selected ? "border-blue-500 ring-2 ring-blue-500/30" : "border-gray-200 dark:border-gray-800"
+                )}
             >
+                {selectable && <div className="mr-3">{renderCheck()}</div>}
                 <div className="w-10 h-10 flex-shrink-0 mr-4 flex items-center justify-center bg-gray-100 dark:bg-gray-800 rounded-lg overflow-hidden">
                     {item.is_dir ? <Folder className="w-6 h-6 text-yellow-400 fill-yellow-400" /> : renderIcon()}
                 </div>
@@ -55,12 +73,14 @@ export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onD
                         {item.is_dir ? 'Folder' : formatSize(item.size)} • {new Date(item.mtime * 1000).toLocaleDateString()}
                     </p>
                 </div>
-                <button 
-                    onClick={(e) => onDownload(item, e)}
-                    className="p-2 text-gray-400 hover:text-blue-600 dark:hover:text-blue-400 hover:bg-gray-100 dark:hover:bg-gray-800 rounded-full transition-colors"
-                >
-                    <Download size={18} />
-                </button>
+                {downloadable && (
+                    <button 
+                        onClick={(e) => onDownload(item, e)}
+                        className="p-2 text-gray-400 hover:text-blue-600 dark:hover:text-blue-400 hover:bg-gray-100 dark:hover:bg-gray-800 rounded-full transition-colors"
+                    >
+                        <Download size={18} />
+                    </button>
+                )}
             </div>
         );
     }
@@ -68,9 +88,13 @@ export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onD
     return (
         <div 
             onClick={() => onClick(item)}
-            className="group bg-white dark:bg-gray-900 border border-gray-200 dark:border-gray-800 rounded-xl overflow-hidden hover:shadow-lg transition-all cursor-pointer flex flex-col active:scale-95"
+            className={clsx(
+                "group bg-white dark:bg-gray-900 border rounded-xl overflow-hidden hover:shadow-lg transition-all cursor-pointer flex flex-col active:scale-95",
+                selected ? "border-blue-500 ring-2 ring-blue-500/30" : "border-gray-200 dark:border-gray-800"
+            )}
         >
             <div className="aspect-[5/4] bg-gray-100 dark:bg-gray-800 relative flex items-center justify-center overflow-hidden">
+                {selectable && <div className="absolute top-2 left-2 z-10">{renderCheck()}</div>}
                 <div className={clsx("w-full h-full flex items-center justify-center", item.is_dir ? "p-8" : "p-0")}>
                     {renderIcon()}
                 </div>
@@ -90,12 +114,14 @@ export const FileCard: React.FC<FileCardProps> = ({ item, viewMode, onClick, onD
                     <span className="text-[10px] text-gray-500 font-medium">
                         {item.is_dir ? '' : formatSize(item.size)}
                     </span>
-                    <button 
-                        onClick={(e) => onDownload(item, e)}
-                        className="p-1.5 text-gray-400 hover:text-blue-600 dark:hover:text-blue-400 hover:bg-gray-100 dark:hover:bg-gray-800 rounded-full transition-colors"
-                    >
-                        <Download size={16} />
-                    </button>
+                    {downloadable && (
+                        <button 
+                            onClick={(e) => onDownload(item, e)}
+                            className="p-1.5 text-gray-400 hover:text-blue-600 dark:hover:text-blue-400 hover:bg-gray-100 dark:hover:bg-gray-800 rounded-full transition-colors"
+                        >
+                            <Download size={16} />
+                        </button>
+                    )}
                 </div>
             </div>
         </div>
@@ -10,7 +10,11 @@ interface PreviewModalProps {
 
 export const PreviewModal: React.FC<PreviewModalProps> = ({ item, onClose, onDownload }) => {
     const fileUrl = `/api/view?path=${encodeURIComponent(item.path)}`;
+    // Screen-sized rendition; the server rounds w up to its nearest width bucket
+    const screenWidth = Math.round(window.innerWidth * (window.devicePixelRatio || 1));
+    const previewUrl = `${fileUrl}&w=${screenWidth}&v=${item.size}-${item.mtime}`;
     const [error, setError] = useState(false);
+    const [showOriginal, setShowOriginal] = useState(false);
 
     // Determine what kind of preview to show
     const renderContent = () => {
@@ -24,7 +28,7 @@ export const PreviewModal: React.FC<PreviewModalProps> = ({ item, onClose, onDow
         }
 
         if (item.type === 'image') {
-            return <img src={fileUrl} className="max-w-full max-h-[85vh] object-contain rounded-lg shadow-2xl" onError={() => setError(true)} />;
+            return <img src={showOriginal ? fileUrl : previewUrl} className="max-w-full max-h-[85vh] object-contain rounded-lg shadow-2xl" onError={() => setError(true)} />;
         }
         
         if (item.type === 'video') {
@@ -80,6 +84,14 @@ export const PreviewModal: React.FC<PreviewModalProps> = ({ item, onClose, onDow
             <div className="absolute top-4 left-4 right-16 flex justify-center pointer-events-none">
                  <div className="bg-gray-900/80 backdrop-blur px-4 py-2 rounded-full flex items-center gap-4 pointer-events-auto border border-white/10">
                     <span className="text-white text-sm font-medium truncate max-w-[200px] md:max-w-md">{item.name}</span>
+                    {item.type === 'image' && !showOriginal && !error && (
+                        <>
+                            <div className="h-4 w-[1px] bg-white/20"></div>
+                            <button onClick={() => setShowOriginal(true)} className="text-xs font-medium text-gray-300 hover:text-white transition-colors">
+                                Original
+                            </button>
+                        </>
+                    )}
                     <div className="h-4 w-[1px] bg-white/20"></div>
                     <button onClick={() => onDownload(item)} className="text-blue-400 hover:text-blue-300 transition-colors">
                         <Download size={18} />
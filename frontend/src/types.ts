@@ -5,7 +5,7 @@ export interface FileItem {
     size: number;
     mtime: number;
     mime: string | null;
-    type: 'folder' | 'image' | 'video' | 'file';
+    type: 'folder' | 'archive' | 'image' | 'video' | 'file';
 }
 
 export interface UploadTask {
@@ -0,0 +1,203 @@
+import os
+import io
+import struct
+import tarfile
+import zipfile
+import time
+import posixpath
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from pathlib import Path
+
+# Archives are browsed as virtual folders: "photos.zip/2023/img.jpg".
+# Member indexes come from the ZIP central directory or a one-off TAR scan and are
+# cached per (path, size, mtime). Stored ZIP members and members of uncompressed TARs
+# are served straight from their byte range in the archive; everything else is
+# decompressed on the fly.
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+INDEX_CACHE_SIZE = 32
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+def archive_kind(name: str):
+    lower = name.lower()
+    if lower.endswith(ZIP_SUFFIXES): return 'zip'
+    if lower.endswith(TAR_SUFFIXES): return 'tar'
+    return None
+
+class Member(NamedTuple):
+    name: str
+    size: int
+    mtime: float
+    is_dir: bool
+    key: object = None     # ZipInfo / TarInfo
+    offset: int = -1       # raw data offset if the bytes are stored uncompressed
+
+class ArchiveIndex:
+    def __init__(self, path: Path, kind: str):
+        self.path = path
+        self.kind = kind
+        self.members = {}           # inner path -> Member
+        self.children = {"": {}}    # inner dir -> {name: inner path}
+
+    def _add(self, inner: str, member: Member):
+        parts = [p for p in inner.split('/') if p and p != '.']
+        if not parts or '..' in parts: return
+        inner = '/'.join(parts)
+        # Implied parent folders
+        for i in range(1, len(parts)):
+            parent = '/'.join(parts[:i])
+            if parent not in self.members:
+                self.members[parent] = Member(parts[i - 1], 0, member.mtime, True)
+            self.children.setdefault('/'.join(parts[:i - 1]), {})[parts[i - 1]] = parent
+            self.children.setdefault(parent, {})
+        if member.is_dir:
+            self.children.setdefault(inner, {})
+            if inner in self.members: return
+        self.members[inner] = member._replace(name=parts[-1])
+        self.children.setdefault('/'.join(parts[:-1]), {})[parts[-1]] = inner
+
+    def listdir(self, inner: str):
+        inner = inner.strip('/')
+        if inner not in self.children:
+            raise FileNotFoundError(inner)
+        return [self.members[p] for p in self.children[inner].values()]
+
+    def member(self, inner: str) -> Member:
+        member = self.members.get(inner.strip('/'))
+        if member is None:
+            raise FileNotFoundError(inner)
+        return member
+
+def _build_zip(path: Path) -> ArchiveIndex:
+    index = ArchiveIndex(path, 'zip')
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            mtime = _dos_time(info.date_time)
+            stored = info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+            index._add(info.filename, Member(info.filename, info.file_size, mtime, info.is_dir(),
+                                             info, 0 if stored else -1))
+    return index
+
+def _build_tar(path: Path) -> ArchiveIndex:
+    index = ArchiveIndex(path, 'tar')
+    raw = path.name.lower().endswith('.tar')
+    with tarfile.open(path, 'r:*') as tf:
+        for info in tf:
+            if not (info.isfile() or info.isdir()): continue
+            index._add(info.name, Member(info.name, info.size, float(info.mtime), info.isdir(),
+                                         info, info.offset_data if raw and info.isfile() and not info.issparse() else -1))
+    return index
+
+def _dos_time(date_time) -> float:
+    try:
+        return time.mktime(date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+_index_cache: "OrderedDict[tuple, ArchiveIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+def get_index(path: Path, st: os.stat_result) -> ArchiveIndex:
+    """ Cached member index. Raises zipfile.BadZipFile / tarfile.TarError for unreadable archives. """
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = _build_zip(path) if archive_kind(path.name) == 'zip' else _build_tar(path)
+
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+# --- Member access ---
+
+class _Slice(io.RawIOBase):
+    """ Read-only window over [offset, offset + size) of a file. """
+
+    def __init__(self, f, offset: int, size: int):
+        self._f, self._offset, self._size, self._pos = f, offset, size, 0
+
+    def readable(self): return True
+    def seekable(self): return True
+    def tell(self): return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, min(self._size, base + pos))
+        return self._pos
+
+    def read(self, n=-1):
+        left = self._size - self._pos
+        n = left if n is None or n < 0 else min(n, left)
+        if n <= 0: return b""
+        self._f.seek(self._offset + self._pos)
+        data = self._f.read(n)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+class _Owned(io.RawIOBase):
+    """ Member stream that also closes the archive it was opened from. """
+
+    def __init__(self, stream, owner):
+        self._stream, self._owner = stream, owner
+
+    def readable(self): return True
+    def seekable(self): return True
+    def read(self, n=-1): return self._stream.read(n)
+    def seek(self, pos, whence=io.SEEK_SET): return self._stream.seek(pos, whence)
+    def tell(self): return self._stream.tell()
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._owner.close()
+            super().close()
+
+def open_member(index: ArchiveIndex, member: Member):
+    """ Seekable, readable file object for a member's contents. """
+    if index.kind == 'zip':
+        if member.offset >= 0:
+            f = open(index.path, 'rb')
+            try:
+                f.seek(member.key.header_offset)
+                sig, name_len, extra_len = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+                if sig != b"PK\x03\x04":
+                    raise zipfile.BadZipFile("Bad local file header")
+            except BaseException:
+                f.close()
+                raise
+            return _Slice(f, member.key.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len, member.size)
+        zf = zipfile.ZipFile(index.path)
+        return _Owned(zf.open(member.key), zf)
+
+    if member.offset >= 0:
+        return _Slice(open(index.path, 'rb'), member.offset, member.size)
+    # Extracting by TarInfo seeks straight to its header offset, so a compressed TAR is only
+    # decompressed up to this member rather than rescanned by name
+    tf = tarfile.open(index.path, 'r:*')
+    try:
+        return _Owned(tf.extractfile(member.key), tf)
+    except BaseException:
+        tf.close()
+        raise
+
+def split_archive_path(path: str):
+    """ Yields (archive_part, inner_part) candidates for paths that continue past an archive name. """
+    parts = [p for p in path.replace('\\', '/').split('/') if p]
+    for i in range(len(parts) - 1, 0, -1):
+        if archive_kind(parts[i - 1]):
+            yield '/'.join(parts[:i]), posixpath.normpath('/'.join(parts[i:]))
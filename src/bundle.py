@@ -0,0 +1,224 @@
+import os
+import zlib
+import queue
+import struct
+import tarfile
+import zipfile
+import threading
+from stat import S_ISDIR, S_ISREG
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Streams a selection of files/folders as one archive.
+#
+# tar.zst: the tar stream is cut into CHUNK_SIZE pieces which a worker pool compresses
+# in parallel as independent zstd frames (concatenated frames are a valid .zst).
+# Chunks made (almost) entirely of already-compressed data (media, archives) are
+# emitted as uncompressed "raw block" frames without running the compressor at all.
+# Chunks are always cut at CHUNK_SIZE, never at file boundaries, so folders that mix
+# photos and small sidecar files don't splinter into tiny frames.
+#
+# zip: written sequentially, but already-compressed files are stored instead of deflated.
+
+CHUNK_SIZE = 4 * 1024 * 1024
+RAW_SHARE = 0.9     # chunks at least this much already-compressed data are stored raw
+ZSTD_LEVEL = 3
+SAMPLE_SIZE = 64 * 1024
+WORKERS = max(2, os.cpu_count() or 2)
+
+STORE_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif', '.avif',
+    '.mp4', '.mkv', '.mov', '.avi', '.webm', '.m4v', '.wmv',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus', '.flac',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.br',
+    '.docx', '.xlsx', '.pptx', '.epub', '.apk', '.jar',
+}
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="bundle")
+
+def formats() -> list:
+    return ["tar.zst", "zip"] if zstandard else ["zip"]
+
+def is_compressible(path: Path, size: int) -> bool:
+    """ Extension check first, then a quick deflate of the first 64 KB for unknown types. """
+    if path.suffix.lower() in STORE_EXTENSIONS: return False
+    if size < 512: return True
+    try:
+        with open(path, 'rb') as f:
+            sample = f.read(SAMPLE_SIZE)
+    except OSError:
+        return True
+    return len(zlib.compress(sample, 1)) < len(sample) * 0.9
+
+def iter_selection(items):
+    """
+    items: [(real_path, arcname)]. Yields (real_path, arcname, stat) for every file and
+    folder below the selection. Symlinks are skipped so nothing outside the share leaks in.
+    """
+    for real_path, arcname in items:
+        st = os.lstat(real_path)
+        yield real_path, arcname, st
+        if not os.path.isdir(real_path) or os.path.islink(real_path): continue
+        for dirpath, dirnames, filenames in os.walk(real_path):
+            base = Path(arcname) / Path(dirpath).relative_to(real_path)
+            for name in sorted(dirnames + filenames):
+                child = Path(dirpath) / name
+                try:
+                    child_st = os.lstat(child)
+                except OSError:
+                    continue
+                if os.path.islink(child): continue
+                yield child, (base / name).as_posix(), child_st
+            dirnames[:] = sorted(d for d in dirnames if not os.path.islink(os.path.join(dirpath, d)))
+
+# --- zstd frames ---
+
+_RAW_BLOCK = 128 * 1024
+
+def raw_zstd_frame(data: bytes) -> bytes:
+    """ A zstd frame made of uncompressed raw blocks (single segment, 4 byte content size). """
+    out = bytearray(struct.pack("<IBI", 0xFD2FB528, 0xA0, len(data)))
+    pos = 0
+    while True:
+        block = data[pos:pos + _RAW_BLOCK]
+        pos += len(block)
+        last = pos >= len(data)
+        header = (len(block) << 3) | int(last)
+        out += header.to_bytes(3, "little") + block
+        if last: return bytes(out)
+
+def _compress_chunk(data: bytes, compressible: bool) -> bytes:
+    if not compressible:
+        return raw_zstd_frame(data)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+# --- Streaming plumbing ---
+
+class _Cancelled(Exception):
+    pass
+
+class _Pipe:
+    """ Bounded hand-off between the archive writer thread and the response generator. """
+
+    def __init__(self, depth: int):
+        self.queue = queue.Queue(maxsize=depth)
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set(): raise _Cancelled()
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+class _ChunkWriter:
+    """ File-like sink for tarfile that hands CHUNK_SIZE pieces to the compression pool. """
+
+    def __init__(self, pipe: _Pipe):
+        self.pipe = pipe
+        self.buf = bytearray()
+        self.raw = 0                # bytes in buf from incompressible files
+        self.compressible = True    # the file currently being written
+
+    def set_compressible(self, compressible: bool):
+        self.compressible = compressible
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            take = min(len(view), CHUNK_SIZE - len(self.buf))
+            self.buf += view[:take]
+            if not self.compressible: self.raw += take
+            view = view[take:]
+            if len(self.buf) >= CHUNK_SIZE:
+                self.flush_chunk()
+        return len(data)
+
+    def flush_chunk(self):
+        if self.buf:
+            compressible = self.raw < len(self.buf) * RAW_SHARE
+            self.pipe.put(_pool.submit(_compress_chunk, bytes(self.buf), compressible))
+            self.buf.clear()
+            self.raw = 0
+
+class _PassWriter:
+    """ Unseekable file-like sink for zipfile (forces data descriptors). """
+
+    def __init__(self, pipe: _Pipe):
+        self.pipe = pipe
+        self.buf = bytearray()
+
+    def write(self, data) -> int:
+        self.buf += data
+        if len(self.buf) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buf:
+            self.pipe.put(bytes(self.buf))
+            self.buf.clear()
+
+def _write_tar_zst(items, pipe: _Pipe):
+    writer = _ChunkWriter(pipe)
+    with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for real_path, arcname, st in iter_selection(items):
+            info = tar.gettarinfo(str(real_path), arcname)
+            if info.isfile():
+                writer.set_compressible(is_compressible(real_path, st.st_size))
+                with open(real_path, 'rb') as f:
+                    tar.addfile(info, f)
+            elif info.isdir():
+                writer.set_compressible(True)
+                tar.addfile(info)
+    writer.flush_chunk()
+
+def _write_zip(items, pipe: _Pipe):
+    writer = _PassWriter(pipe)
+    with zipfile.ZipFile(writer, 'w', allowZip64=True) as zf:
+        for real_path, arcname, st in iter_selection(items):
+            if S_ISDIR(st.st_mode):
+                zf.writestr(zipfile.ZipInfo.from_file(real_path, arcname), b"")
+                continue
+            if not S_ISREG(st.st_mode): continue   # FIFOs, sockets, devices: opening them could block
+            info = zipfile.ZipInfo.from_file(real_path, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED if is_compressible(real_path, st.st_size) else zipfile.ZIP_STORED
+            with open(real_path, 'rb') as src, zf.open(info, 'w', force_zip64=True) as dest:
+                while chunk := src.read(1024 * 1024):
+                    dest.write(chunk)
+    writer.flush()
+
+def stream_archive(items, fmt: str):
+    """ Generator of archive bytes for [(real_path, arcname)]. Writing happens on a background thread. """
+    if fmt == "tar.zst" and not zstandard:
+        raise ValueError("zstandard is not installed")
+    pipe = _Pipe(depth=WORKERS * 2)
+    target = _write_tar_zst if fmt == "tar.zst" else _write_zip
+    done = object()
+
+    def produce():
+        try:
+            target(items, pipe)
+            pipe.put(done)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            try: pipe.put(e)
+            except _Cancelled: pass
+
+    threading.Thread(target=produce, daemon=True, name="bundle-writer").start()
+    try:
+        while True:
+            item = pipe.queue.get()
+            if item is done: return
+            if isinstance(item, BaseException): raise item
+            yield item.result() if isinstance(item, Future) else item
+    finally:
+        pipe.cancelled.set()
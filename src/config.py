@@ -21,6 +21,8 @@ class ServerConfig:
     PASSWORD = "password"
     ALLOW_UPLOAD = False
     UPLOAD_DIR = ""
+    # Fill the thumbnail cache in the background while the server is idle
+    PREWARM_THUMBS = True
     # Temp folder for thumbs
     THUMB_CACHE_DIR = Path(tempfile.gettempdir()) / "RapydShare_Thumbs"
 
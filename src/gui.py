@@ -1,7 +1,7 @@
 import sys
 import os
 import threading
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QWidget, QFileDialog, QApplication, QFrame, QLabel
 )
@@ -16,7 +16,7 @@ from qfluentwidgets import (
 )
 
 from src.config import config
-from src.server import run_server, stop_server_logic
+from src.server import run_server, stop_server_logic, prewarmer
 # Import our new QR code generator and the existing IP function
 from src.utils import get_local_ip, generate_qr_code_pixmap
 
@@ -35,6 +35,11 @@ class ServerLauncher(QWidget):
         self.is_running = False
         self.server_thread = None
 
+        # Polls the background thumbnail crawler while the server runs
+        self.prewarm_timer = QTimer(self)
+        self.prewarm_timer.setInterval(1000)
+        self.prewarm_timer.timeout.connect(self.update_prewarm_status)
+
         # --- Main Layout: HORIZONTAL ---
         self.main_h_layout = QHBoxLayout(self)
         self.main_h_layout.setContentsMargins(0, 0, 0, 0)
@@ -206,6 +211,11 @@ class ServerLauncher(QWidget):
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         self.status_label.setStyleSheet("color: #888888; margin-top: 5px;")
         self.v_layout.addWidget(self.status_label)
+
+        self.prewarm_label = CaptionLabel("", self)
+        self.prewarm_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        self.prewarm_label.setStyleSheet("color: #888888;")
+        self.v_layout.addWidget(self.prewarm_label)
         self.v_layout.addStretch(1)
 
     def create_label_with_help(self, text, help_text):
@@ -310,6 +320,9 @@ class ServerLauncher(QWidget):
             self.qr_code_label.setText("QR Error")
             print(f"QR Generation Failed: {e}")
 
+        if config.PREWARM_THUMBS:
+            self.prewarm_timer.start()
+
         QApplication.clipboard().setText(link)
         self.show_success("Online", f"Server running. Copied link to clipboard.")
 
@@ -321,6 +334,8 @@ class ServerLauncher(QWidget):
         self.set_inputs_enabled(True)
         self.folder_input.setReadOnly(False)
         self.status_label.setText("Ready")
+        self.prewarm_timer.stop()
+        self.prewarm_label.setText("")
 
         # --- Reset QR code panel ---
         self.qr_code_label.setText("Server is offline")
@@ -329,6 +344,18 @@ class ServerLauncher(QWidget):
         
         self.show_info("Offline", "Server has been stopped.")
 
+    def update_prewarm_status(self):
+        info = prewarmer.status()
+        if info["state"] == "done":
+            text = f"Thumbnails ready ({info['generated']} generated)"
+        elif info["state"] == "paused":
+            text = f"Thumbnails: {info['generated']} generated, paused while clients are busy"
+        elif info["state"] == "running":
+            text = f"Thumbnails: {info['generated']} generated, {info['queued']} folders queued"
+        else:
+            text = ""
+        self.prewarm_label.setText(text)
+
     def set_inputs_enabled(self, enable):
         self.btn_browse.setEnabled(enable)
         self.port_input.setEnabled(enable)
@@ -0,0 +1,275 @@
+import os
+import stat
+import errno
+import posixpath
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+_O_DIR = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_CLOEXEC", 0)
+# O_NONBLOCK so a FIFO can't hang the open; it has no effect on regular files.
+_O_FILE = (os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_CLOEXEC", 0)
+           | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0))
+_O_NEW = (os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0)
+          | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0))
+# openat()/fstatat() sandboxing needs dir_fd support (not available on Windows).
+HAVE_DIR_FD = (hasattr(os, "O_NOFOLLOW") and hasattr(os, "O_DIRECTORY")
+               and all(f in os.supports_dir_fd for f in (os.open, os.stat, os.mkdir, os.unlink, os.rename)))
+
+def split_relative(path: str) -> tuple:
+    """ Normalises a client supplied path into components, refusing anything that escapes the root. """
+    norm = posixpath.normpath(path.replace("\\", "/").lstrip("/") or ".")
+    parts = tuple(p for p in norm.split("/") if p and p != ".")
+    if (parts and parts[0] == "..") or any("\x00" in p for p in parts):
+        raise PermissionError(path)
+    return parts
+
+class PathResolver:
+    """
+    Resolves client paths inside a root folder.
+
+    On POSIX every directory is opened relative to its parent's fd with O_NOFOLLOW, so
+    nothing outside the root can be reached however the path is spelled. Opened directory
+    fds are kept in a bounded LRU; a cached fd is trusted only while lstat() of that path
+    still finds the same inode, so renames, deletes and swaps for a symlink invalidate it.
+    Symlinks are only followed when their target is still inside the root.
+
+    open() and scandir() work on the fds themselves, so what they return is what the walk
+    checked. resolve() only returns a path; anything reopened from it (video thumbnails,
+    sync) can still be raced by someone who can rename inside the share. Checking a
+    folder says nothing about what is below it: code that walks a resolved folder by
+    path (folder and selection downloads via bundle.iter_selection) must skip symlinks
+    itself, or links inside the share would pull outside files into the archive.
+    A directory moved out of the root while its fd is cached stays reachable through that
+    fd until the cached lstat() check notices the path changed.
+    """
+
+    def __init__(self, max_dirs: int = 256):
+        self.max_dirs = max_dirs
+        self._lock = threading.Lock()
+        self._root = None
+        self._root_real = None
+        self._root_fd = None
+        self._dirs = OrderedDict()  # parts -> (fd, st_dev, st_ino)
+
+    def resolve(self, root: str, path: str):
+        """ Returns (real_path, lstat) for path inside root. Raises PermissionError / FileNotFoundError. """
+        parts = split_relative(path)
+        with self._lock:
+            self._set_root(root)
+            if not HAVE_DIR_FD:
+                return self._resolve_fallback(parts)
+            if not parts:
+                return self._root_real, os.stat(self._root_fd)
+            try:
+                parent_fd = self._dir_fd(parts[:-1])
+                if parent_fd is None:
+                    return self._resolve_fallback(parts)
+                st = os.stat(parts[-1], dir_fd=parent_fd, follow_symlinks=False)
+            except NotADirectoryError:
+                raise FileNotFoundError(path)
+            if stat.S_ISLNK(st.st_mode):
+                return self._resolve_fallback(parts)
+            return self._root_real.joinpath(*parts), st
+
+    def open(self, root: str, path: str):
+        """ Opens a regular file without following symlinks that leave root. Returns (file, real_path, fstat). """
+        parts = split_relative(path)
+        if not parts:
+            raise IsADirectoryError(path)
+        with self._lock:
+            self._set_root(root)
+            fd, real_path = self._open_at(parts)
+        f = os.fdopen(fd, 'rb')
+        try:
+            st = os.fstat(f.fileno())
+        except BaseException:
+            f.close()
+            raise
+        if not stat.S_ISREG(st.st_mode):
+            f.close()
+            raise FileNotFoundError(path)
+        return f, real_path, st
+
+    @contextmanager
+    def scandir(self, root: str, path: str):
+        """ os.scandir() of a directory inside root, listed through its own fd where possible. """
+        parts = split_relative(path)
+        with self._lock:
+            self._set_root(root)
+            target = None
+            if HAVE_DIR_FD:
+                parent = self._dir_fd(parts) if parts else self._root_fd
+                if parent is not None:
+                    # A fresh open file description, so the cached fd's read offset is untouched
+                    target = os.open(".", _O_DIR, dir_fd=parent)
+            if target is None:
+                target = str(self._resolve_fallback(parts)[0])
+        try:
+            with os.scandir(target) as entries:
+                yield entries
+        finally:
+            if isinstance(target, int):
+                os.close(target)
+
+    def create(self, root: str, path: str, mode: int = 0o666):
+        """ Creates a new file exclusively, never through a symlink. Returns (fd, real_path). """
+        parts = split_relative(path)
+        if not parts:
+            raise IsADirectoryError(path)
+        with self._lock:
+            self._set_root(root)
+            return self._open_at(parts, _O_NEW, mode)
+
+    def makedirs(self, root: str, path: str):
+        """ Like os.makedirs(exist_ok=True) for a directory inside root. """
+        parts = split_relative(path)
+        with self._lock:
+            self._set_root(root)
+            if HAVE_DIR_FD:
+                for i in range(len(parts)):
+                    parent = self._dir_fd(parts[:i])
+                    if parent is None: break
+                    try:
+                        os.mkdir(parts[i], dir_fd=parent)
+                    except FileExistsError:
+                        pass
+                else:
+                    self._dir_fd(parts)   # raises if the last one isn't a directory
+                    return
+            os.makedirs(self._contained(parts), exist_ok=True)
+
+    def replace(self, root: str, src: str, dst: str):
+        """ os.replace() between two paths inside root. """
+        src_parts, dst_parts = split_relative(src), split_relative(dst)
+        if not src_parts or not dst_parts:
+            raise IsADirectoryError(src if not src_parts else dst)
+        with self._lock:
+            self._set_root(root)
+            if HAVE_DIR_FD:
+                src_fd = self._dir_fd(src_parts[:-1])
+                dst_fd = src_fd if dst_parts[:-1] == src_parts[:-1] else self._dir_fd(dst_parts[:-1])
+                if src_fd is not None and dst_fd is not None:
+                    os.replace(src_parts[-1], dst_parts[-1], src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+                    return
+            os.replace(self._contained_parent(src_parts), self._contained_parent(dst_parts))
+
+    def unlink(self, root: str, path: str):
+        parts = split_relative(path)
+        if not parts:
+            raise IsADirectoryError(path)
+        with self._lock:
+            self._set_root(root)
+            if HAVE_DIR_FD:
+                parent = self._dir_fd(parts[:-1])
+                if parent is not None:
+                    os.unlink(parts[-1], dir_fd=parent)
+                    return
+            os.unlink(self._contained_parent(parts))
+
+    @property
+    def root_path(self) -> Path:
+        """ Real path of the root from the last resolve(). """
+        return self._root_real
+
+    def clear(self):
+        with self._lock:
+            self._close_all()
+            self._root = None
+
+    # --- internals (lock held) ---
+
+    def _set_root(self, root: str):
+        if root == self._root and (self._root_fd is not None or not HAVE_DIR_FD):
+            return
+        self._close_all()
+        self._root = root
+        self._root_real = Path(os.path.realpath(root))
+        if HAVE_DIR_FD:
+            self._root_fd = os.open(self._root_real, _O_DIR)
+
+    def _close_all(self):
+        for fd, _, _ in self._dirs.values():
+            os.close(fd)
+        self._dirs.clear()
+        if self._root_fd is not None:
+            os.close(self._root_fd)
+            self._root_fd = None
+
+    def _dir_fd(self, parts: tuple):
+        """ fd of the directory root/parts, or None if a symlink is in the way. """
+        depth = len(parts)
+        fd = self._root_fd
+        while depth:
+            cached = self._cached(parts[:depth])
+            if cached is not None:
+                fd = cached
+                break
+            depth -= 1
+
+        for i in range(depth, len(parts)):
+            try:
+                fd = os.open(parts[i], _O_DIR, dir_fd=fd)
+            except OSError as e:
+                st = os.stat(parts[i], dir_fd=fd, follow_symlinks=False)
+                if stat.S_ISLNK(st.st_mode):
+                    return None
+                if not stat.S_ISDIR(st.st_mode):
+                    raise NotADirectoryError(parts[i]) from e
+                raise
+            st = os.stat(fd)
+            self._dirs[parts[:i + 1]] = (fd, st.st_dev, st.st_ino)
+            while len(self._dirs) > self.max_dirs:
+                os.close(self._dirs.popitem(last=False)[1][0])
+        return fd
+
+    def _cached(self, parts: tuple):
+        entry = self._dirs.get(parts)
+        if entry is None:
+            return None
+        fd, dev, ino = entry
+        try:
+            st = os.stat(self._root_real.joinpath(*parts), follow_symlinks=False)
+            if (st.st_dev, st.st_ino) == (dev, ino):
+                self._dirs.move_to_end(parts)
+                return fd
+        except OSError:
+            pass
+        os.close(fd)
+        del self._dirs[parts]
+        return None
+
+    def _open_at(self, parts: tuple, flags: int = _O_FILE, mode: int = 0o666):
+        if HAVE_DIR_FD:
+            try:
+                parent = self._dir_fd(parts[:-1])
+            except NotADirectoryError:
+                raise FileNotFoundError("/".join(parts))
+            if parent is not None:
+                try:
+                    return os.open(parts[-1], flags, mode, dir_fd=parent), self._root_real.joinpath(*parts)
+                except OSError as e:
+                    if e.errno != errno.ELOOP: raise
+        # Symlink on the way (or no dir_fd support): only follow it if it stays inside the root
+        real_path = self._contained_parent(parts) if flags & os.O_CREAT else self._contained(parts)
+        return os.open(real_path, flags, mode), real_path
+
+    def _resolve_fallback(self, parts: tuple):
+        real = self._contained(parts)
+        return real, os.stat(real)
+
+    def _contained_parent(self, parts: tuple) -> Path:
+        # For creating/renaming: the last component itself is never followed
+        return self._contained(parts[:-1]) / parts[-1]
+
+    def _contained(self, parts: tuple) -> Path:
+        real = Path(os.path.realpath(self._root_real.joinpath(*parts)))
+        root = os.path.normcase(str(self._root_real))
+        try:
+            inside = os.path.commonpath([os.path.normcase(str(real)), root]) == root
+        except ValueError:
+            inside = False
+        if not inside:
+            raise PermissionError(str(real))
+        return real
@@ -0,0 +1,249 @@
+import os
+import time
+import mimetypes
+import threading
+from collections import deque
+from pathlib import Path
+
+from src.config import config
+from src.utils import generate_thumbnail, cache_digest
+
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.GetSystemTimes.argtypes = (ctypes.POINTER(wintypes.FILETIME),) * 3
+    _kernel32.GetSystemTimes.restype = wintypes.BOOL
+    _kernel32.GetCurrentThread.restype = wintypes.HANDLE
+    _kernel32.SetThreadPriority.argtypes = (wintypes.HANDLE, ctypes.c_int)
+    _kernel32.SetThreadPriority.restype = wintypes.BOOL
+else:
+    _kernel32 = None
+
+# Background thumbnail crawler.
+#
+# Walks the shared folder breadth-first and fills the thumbnail cache before anyone asks.
+# A folder a client just opened jumps the queue, followed by its subfolders and then its
+# siblings (in listing order), so the next click is most likely already warm. Only a new
+# visit interrupts the folder being crawled. The crawler only works while the machine
+# and the server are otherwise idle:
+#   - paused while any request is in flight and for IDLE_GRACE seconds after the last one
+#   - paused while the load average per core (CPU usage on Windows) is above MAX_LOAD
+#   - never uses more than DUTY_CYCLE of one core, even when idle
+
+IDLE_GRACE = 2.0
+MAX_LOAD = 0.75
+DUTY_CYCLE = 0.5
+RECENT_VISITS = 20
+CPU_WINDOW = 0.25      # seconds measured when there is no recent CPU time sample (Windows)
+CPU_STALE = 2.0
+THREAD_PRIORITY_IDLE = -15
+
+def _cpu_times():
+    """ (monotonic, idle, total) CPU times from GetSystemTimes, or None. """
+    idle, kernel, user = wintypes.FILETIME(), wintypes.FILETIME(), wintypes.FILETIME()
+    if not _kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+        return None
+    ticks = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+    # Kernel time already includes idle time
+    return time.monotonic(), ticks(idle), ticks(kernel) + ticks(user)
+
+class ThumbnailPrewarmer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._root = None
+        self._urgent = deque()       # (rel_dir, "visit" | "neighbour"), ahead of the background crawl
+        self._pending = deque()      # breadth-first crawl frontier
+        self._crawled = set()
+        self._recent = deque(maxlen=RECENT_VISITS)
+        self._active = 0
+        self._last_activity = 0.0
+        self._cpu_sample = None
+        self.generated = 0
+        self.current = ""
+        self.state = "stopped"
+
+    # --- Control ---
+
+    def start(self, root: str):
+        self.stop()
+        with self._lock:
+            real_root = Path(os.path.realpath(root))
+            if real_root != self._root:
+                # Recent visits are relative paths into the old share
+                self._recent.clear()
+            self._root = real_root
+            self._urgent = deque()
+            for rel in reversed(self._recent):
+                self._queue_visit(rel)
+            self._pending = deque([""])
+            self._crawled = set()
+            self.generated = 0
+            self.current = ""
+            self.state = "running"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="thumb-prewarm")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.state = "stopped"
+
+    def note_visit(self, rel: str):
+        """ A client opened this folder: crawl it, its subfolders and its siblings next. """
+        rel = rel.strip("/")
+        with self._lock:
+            if rel in self._recent: self._recent.remove(rel)
+            self._recent.appendleft(rel)
+            self._queue_visit(rel)
+        self._wake.set()
+
+    def _queue_visit(self, rel: str):
+        # Crawling a visit queues its subfolders and siblings right behind it (lock held)
+        self._urgent.appendleft((rel, "visit"))
+
+    def transfer_started(self):
+        with self._lock:
+            self._active += 1
+            self._last_activity = time.monotonic()
+
+    def transfer_finished(self):
+        with self._lock:
+            self._active -= 1
+            self._last_activity = time.monotonic()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "generated": self.generated, "current": self.current,
+                    "queued": len(self._urgent) + len(self._pending)}
+
+    # --- Worker ---
+
+    def _run(self):
+        if _kernel32 is not None:
+            _kernel32.SetThreadPriority(_kernel32.GetCurrentThread(), THREAD_PRIORITY_IDLE)
+        else:
+            try:
+                # Linux lets us renice just this thread; elsewhere the duty cycle does the work
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except (AttributeError, OSError):
+                pass
+
+        while not self._stop.is_set():
+            job = self._next_job()
+            if job is None:
+                self.state = "done"
+                self._wake.wait(30)
+                self._wake.clear()
+                continue
+            rel, kind = job
+            self._crawl_dir(rel, kind)
+
+    def _next_job(self):
+        with self._lock:
+            while self._urgent:
+                rel, kind = self._urgent.popleft()
+                if kind == "visit" or rel not in self._crawled:
+                    return rel, kind
+            while self._pending:
+                rel = self._pending.popleft()
+                if rel not in self._crawled:
+                    return rel, "background"
+        return None
+
+    def _scan(self, rel: str):
+        """ Sorted (subfolders, media entries) of a folder, skipping symlinks. """
+        directory = self._root.joinpath(*rel.split("/")) if rel else self._root
+        subdirs, media = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_symlink(): continue
+                if entry.is_dir():
+                    subdirs.append(f"{rel}/{entry.name}" if rel else entry.name)
+                elif entry.is_file():
+                    mime, _ = mimetypes.guess_type(entry.name)
+                    if mime and (mime.startswith('image') or mime.startswith('video')):
+                        media.append(entry)
+        subdirs.sort()
+        media.sort(key=lambda e: e.name)
+        return subdirs, media
+
+    def _crawl_dir(self, rel: str, kind: str):
+        try:
+            subdirs, media = self._scan(rel)
+            siblings = []
+            if kind == "visit" and rel:
+                parent = rel.rsplit("/", 1)[0] if "/" in rel else ""
+                siblings = [d for d in self._scan(parent)[0] if d != rel]
+        except OSError:
+            return
+
+        with self._lock:
+            self._crawled.add(rel)
+            self._pending.extend(d for d in subdirs if d not in self._crawled)
+            if kind == "visit":
+                self._urgent.extendleft((d, "neighbour") for d in reversed(subdirs + siblings))
+
+        for entry in media:
+            if self._stop.is_set(): return
+            self._throttle()
+            with self._lock:
+                if self._urgent and self._urgent[0][1] == "visit":
+                    # A client opened another folder; finish this one later
+                    self._crawled.discard(rel)
+                    self._pending.appendleft(rel)
+                    return
+            # Same cache key as /api/thumb, so the endpoint finds these files
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            real_path = Path(entry.path)
+            thumb_path = config.THUMB_CACHE_DIR / f"{cache_digest(str(real_path), st)}.jpg"
+            if thumb_path.exists(): continue
+
+            self.current = f"{rel}/{entry.name}" if rel else entry.name
+            started = time.monotonic()
+            if generate_thumbnail(real_path, thumb_path):
+                with self._lock:
+                    self.generated += 1
+            # Rest at least as long as we worked
+            self._stop.wait((time.monotonic() - started) * (1 / DUTY_CYCLE - 1))
+        self.current = ""
+
+    def _throttle(self):
+        while not self._stop.is_set():
+            with self._lock:
+                busy = self._active > 0 or time.monotonic() - self._last_activity < IDLE_GRACE
+            if not busy and not self._system_busy():
+                self.state = "running"
+                return
+            self.state = "paused"
+            self._stop.wait(0.5)
+
+    def _system_busy(self) -> bool:
+        if _kernel32 is not None:
+            return self._cpu_busy()
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1) > MAX_LOAD
+        except (AttributeError, OSError):
+            return False
+
+    def _cpu_busy(self) -> bool:
+        # Windows has no load average: busy share of all cores since the previous sample
+        now, last = _cpu_times(), self._cpu_sample
+        if now is None: return False
+        if last is None or now[0] - last[0] > CPU_STALE:
+            self._stop.wait(CPU_WINDOW)
+            last, now = now, _cpu_times()
+            if now is None: return False
+        self._cpu_sample = now
+        idle, total = now[1] - last[1], now[2] - last[2]
+        return total > 0 and 1 - idle / total > MAX_LOAD
@@ -1,25 +1,57 @@
 import os
 import re
 import uvicorn
+import json
+import hashlib
 import secrets
 import mimetypes
-import shutil
 import asyncio
 import aiofiles
+import posixpath
+import tarfile
+import zipfile
 from datetime import datetime
+from email.utils import formatdate
+from urllib.parse import quote
 from pathlib import Path
+from stat import S_ISDIR, S_ISREG
 from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, HTTPException, Depends, status, Request, UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from typing import List
+from fastapi import FastAPI, HTTPException, Depends, status, Request, UploadFile, File, Form, Query
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.staticfiles import StaticFiles
 
 from src.config import config
-from src.utils import generate_thumbnail
+from src.utils import generate_thumbnail, generate_rendition, rendition_bucket, rendition_format, cache_digest
+from src.paths import PathResolver
+from src import sync, archives, bundle
+from src.prewarm import ThumbnailPrewarmer
 
 executor = ThreadPoolExecutor(max_workers=4)
 security = HTTPBasic(auto_error=False)
 app = FastAPI()
+# Sandboxed, cached path resolution for the shared and upload folders
+root_resolver = PathResolver()
+upload_resolver = PathResolver(max_dirs=64)
+prewarmer = ThumbnailPrewarmer()
+
+class ActivityMiddleware:
+    """ Counts in-flight requests (until the body is fully sent) so background work can back off. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        prewarmer.transfer_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            prewarmer.transfer_finished()
+
+app.add_middleware(ActivityMiddleware)
 
 # Global variable to hold the server instance
 global_server = None
@@ -39,21 +71,20 @@ def sanitize_filename(name: str) -> str:
         name = '_' + name
     return name
 
-def resolve_unique_path(target_dir: Path, filename: str) -> Path:
-    candidate = target_dir / filename
-    if not candidate.exists():
-        return candidate
+def create_unique_file(resolver: PathResolver, root: str, filename: str):
+    """ Exclusively creates filename in root, as "name (1).ext" etc. if taken. Returns (fd, real_path). """
     if '.' in filename:
         stem, ext = filename.rsplit('.', 1)
         ext = '.' + ext
     else:
         stem, ext = filename, ''
-    i = 1
+    candidate, i = filename, 1
     while True:
-        candidate = target_dir / f"{stem} ({i}){ext}"
-        if not candidate.exists():
-            return candidate
-        i += 1
+        try:
+            return resolver.create(root, candidate)
+        except FileExistsError:
+            candidate = f"{stem} ({i}){ext}"
+            i += 1
 
 def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
     if not config.USE_AUTH: return "guest"
@@ -67,71 +98,275 @@ def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid creds", {"WWW-Authenticate": "Basic"})
     return credentials.username
 
+def resolve_path(path: str, resolver: PathResolver = root_resolver, root: str = None):
+    """ Maps a client path to (real_path, stat) inside the shared folder, or raises 403/404. """
+    try:
+        return resolver.resolve(config.ROOT_DIR if root is None else root, path)
+    except PermissionError:
+        raise HTTPException(403)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(404)
+
+def open_path(path: str):
+    """ Opens a regular file in the shared folder through the resolver. Returns (file, real_path, fstat). """
+    try:
+        return root_resolver.open(config.ROOT_DIR, path)
+    except PermissionError:
+        raise HTTPException(403)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise HTTPException(404)
+
+def resolve_entry(path: str):
+    """ Like resolve_path, but the path may continue inside a ZIP/TAR archive. Returns (real_path, stat, inner). """
+    try:
+        real_path, st = resolve_path(path)
+        return real_path, st, None
+    except HTTPException as e:
+        if e.status_code != 404: raise
+        for archive_path, inner in archives.split_archive_path(path):
+            try:
+                real_path, st = resolve_path(archive_path)
+            except HTTPException:
+                continue
+            if S_ISREG(st.st_mode):
+                return real_path, st, inner
+        raise
+
+async def load_archive(real_path: Path, st):
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(executor, archives.get_index, real_path, st)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError):
+        raise HTTPException(415, "Unreadable archive")
+
+async def load_member(real_path: Path, st, inner: str):
+    index = await load_archive(real_path, st)
+    try:
+        member = index.member(inner)
+    except FileNotFoundError:
+        raise HTTPException(404)
+    if member.is_dir: raise HTTPException(404)
+    return index, member
+
+def listing_item(path: str, name: str, is_dir: bool, size: int, mtime: float, browsable: bool = True):
+    mime, _ = mimetypes.guess_type(name)
+    if is_dir: kind = "folder"
+    elif browsable and archives.archive_kind(name): kind = "archive"
+    elif mime and mime.startswith('image'): kind = "image"
+    elif mime and mime.startswith('video'): kind = "video"
+    else: kind = "file"
+    return {
+        "name": name,
+        "path": str(Path(path) / name).replace("\\", "/"),
+        "is_dir": is_dir,
+        "size": size,
+        "mtime": mtime,
+        "mime": mime,
+        "type": kind
+    }
+
+def stream_file(request: Request, opener, size: int, mtime: float, name: str, filename: str = None):
+    """ Streams opener()'s contents, honouring a single byte Range like FileResponse does. """
+    start, end = 0, size - 1
+    status_code = 200
+    headers = {"accept-ranges": "bytes", "last-modified": formatdate(mtime, usegmt=True)}
+
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get("range", "").strip())
+    if match and (match.group(1) or match.group(2)):
+        if match.group(1):
+            start = int(match.group(1))
+            if match.group(2): end = min(int(match.group(2)), size - 1)
+        else:
+            start = max(0, size - int(match.group(2)))
+        if start >= size or start > end:
+            raise HTTPException(416, headers={"content-range": f"bytes */{size}"})
+        status_code = 206
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-length"] = str(end - start + 1)
+    if filename:
+        headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+
+    def body():
+        with opener() as f:
+            if start: f.seek(start)
+            left = end - start + 1
+            while left > 0:
+                chunk = f.read(min(left, 1024 * 1024))
+                if not chunk: break
+                left -= len(chunk)
+                yield chunk
+
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return StreamingResponse(body(), status_code=status_code, headers=headers, media_type=media_type)
+
+def stream_member(request: Request, index, member, filename: str = None):
+    return stream_file(request, lambda: archives.open_member(index, member), member.size, member.mtime,
+                       member.name, filename)
+
+def stream_opened(request: Request, f, real_path: Path, st, filename: str = None):
+    # Serves the already opened fd, so the file checked by the resolver is the one sent
+    return stream_file(request, lambda: f, st.st_size, st.st_mtime, real_path.name, filename)
+
+def not_modified(request: Request, etag: str) -> bool:
+    """ True if the client's If-None-Match already names this ETag. """
+    header = request.headers.get("if-none-match")
+    if not header: return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+def listing_response(request: Request, items: list):
+    # Listings revalidate on every visit; the ETag makes unchanged folders a bodiless 304.
+    body = json.dumps(items, separators=(",", ":")).encode()
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    headers = {"etag": etag, "cache-control": "no-cache"}
+    if not_modified(request, etag): return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def member_thumbnail(index, member, thumb_path: Path):
+    with archives.open_member(index, member) as f:
+        return generate_thumbnail(Path(member.name), thumb_path, f)
+
+def member_rendition(index, member, out_path: Path, width: int, fmt: str):
+    with archives.open_member(index, member) as f:
+        return generate_rendition(Path(member.name), out_path, width, fmt, f)
+
+def file_thumbnail(f, real_path: Path, thumb_path: Path):
+    with f:
+        # OpenCV can only read videos by path
+        mime = mimetypes.guess_type(real_path.name)[0] or ""
+        return generate_thumbnail(real_path, thumb_path, None if mime.startswith('video') else f)
+
+def file_rendition(f, real_path: Path, out_path: Path, width: int, fmt: str):
+    with f:
+        return generate_rendition(real_path, out_path, width, fmt, f)
+
 @app.get("/api/files", dependencies=[Depends(get_current_username)])
-async def list_files(path: str = ""):
-    req_path = (Path(config.ROOT_DIR) / path).resolve()
-    if not str(req_path).startswith(str(Path(config.ROOT_DIR).resolve())): raise HTTPException(403)
-    if not req_path.exists(): raise HTTPException(404)
+async def list_files(request: Request, path: str = ""):
+    req_path, st, inner = resolve_entry(path)
+    if S_ISREG(st.st_mode) and archives.archive_kind(req_path.name):
+        index = await load_archive(req_path, st)
+        try:
+            members = index.listdir(inner or "")
+        except FileNotFoundError:
+            raise HTTPException(404)
+        return listing_response(request, [listing_item(path, m.name, m.is_dir, m.size, m.mtime, browsable=False) for m in members])
+    if not S_ISDIR(st.st_mode): raise HTTPException(404)
     
     items = []
     try:
-        with os.scandir(req_path) as entries:
+        with root_resolver.scandir(config.ROOT_DIR, path) as entries:
             for entry in entries:
                 try:
                     stat = entry.stat()
-                    is_dir = entry.is_dir()
-                    mime, _ = mimetypes.guess_type(entry.path)
-                    items.append({
-                        "name": entry.name,
-                        "path": str(Path(path) / entry.name).replace("\\", "/"),
-                        "is_dir": is_dir,
-                        "size": stat.st_size,
-                        "mtime": stat.st_mtime,
-                        "mime": mime,
-                        "type": "folder" if is_dir else ("image" if mime and mime.startswith('image') else ("video" if mime and mime.startswith('video') else "file"))
-                    })
+                    items.append(listing_item(path, entry.name, entry.is_dir(), stat.st_size, stat.st_mtime))
                 except: continue
     except PermissionError: raise HTTPException(403)
-    return items
+    except (FileNotFoundError, NotADirectoryError): raise HTTPException(404)
+    if config.PREWARM_THUMBS: prewarmer.note_visit(req_path.relative_to(root_resolver.root_path).as_posix())
+    return listing_response(request, items)
 
 @app.get("/api/thumb", dependencies=[Depends(get_current_username)])
-async def get_thumb(path: str):
-    real_path = (Path(config.ROOT_DIR) / path).resolve()
-    import hashlib
-    hash_name = hashlib.md5(str(real_path).encode('utf-8')).hexdigest() + ".jpg"
-    thumb_path = config.THUMB_CACHE_DIR / hash_name
-    
-    if thumb_path.exists(): return FileResponse(thumb_path)
-    if real_path.exists():
-        loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(executor, generate_thumbnail, real_path, thumb_path)
-        if success: return FileResponse(thumb_path)
+async def get_thumb(request: Request, path: str, v: str = None):
+    real_path, st, inner = resolve_entry(path)
+    # Keyed on the source's size and mtime, so an edited file gets a new thumbnail and ETag
+    thumb_key = str(real_path) if inner is None else f"{real_path}/{inner}"
+    digest = cache_digest(thumb_key, st)
+    thumb_path = config.THUMB_CACHE_DIR / f"{digest}.jpg"
+    # `v` is the client's copy of size/mtime from the listing, which makes the URL itself versioned
+    headers = {"etag": f'"{digest}"',
+               "cache-control": "private, max-age=31536000, immutable" if v else "no-cache"}
+
+    if not_modified(request, headers["etag"]): return Response(status_code=304, headers=headers)
+    if thumb_path.exists(): return FileResponse(thumb_path, headers=headers)
+    loop = asyncio.get_event_loop()
+    if inner is not None:
+        index, member = await load_member(real_path, st, inner)
+        success = await loop.run_in_executor(executor, member_thumbnail, index, member, thumb_path)
+        if success: return FileResponse(thumb_path, headers=headers)
+    elif S_ISREG(st.st_mode):
+        f, real_path, st = open_path(path)
+        success = await loop.run_in_executor(executor, file_thumbnail, f, real_path, thumb_path)
+        if success: return FileResponse(thumb_path, headers=headers)
     raise HTTPException(404)
 
 @app.get("/api/download", dependencies=[Depends(get_current_username)])
-async def download_file(path: str):
-    real_path = (Path(config.ROOT_DIR) / path).resolve()
-    if real_path.is_file(): return FileResponse(real_path, filename=real_path.name)
-    raise HTTPException(404)
+async def download_file(path: str, request: Request):
+    real_path, st, inner = resolve_entry(path)
+    if inner is not None:
+        index, member = await load_member(real_path, st, inner)
+        return stream_member(request, index, member, filename=member.name)
+    if not S_ISREG(st.st_mode): raise HTTPException(404)
+    f, real_path, st = open_path(path)
+    return stream_opened(request, f, real_path, st, filename=real_path.name)
 
 @app.get("/api/download_folder", dependencies=[Depends(get_current_username)])
 async def download_folder(path: str):
-    real_path = (Path(config.ROOT_DIR) / path).resolve()
-    if not real_path.is_dir(): raise HTTPException(400)
-    temp_zip = config.THUMB_CACHE_DIR / f"dl_{int(datetime.now().timestamp())}.zip"
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(executor, shutil.make_archive, str(temp_zip).replace('.zip',''), 'zip', real_path)
-    return FileResponse(temp_zip, filename=f"{real_path.name}.zip")
+    real_path, st = resolve_path(path)
+    if not S_ISDIR(st.st_mode): raise HTTPException(400)
+    # Streamed like a selection, which never follows symlinks inside the folder
+    name = real_path.name or "RapydShare"
+    return StreamingResponse(bundle.stream_archive([(real_path, name)], "zip"), media_type="application/zip",
+                             headers={"content-disposition": f"attachment; filename*=utf-8''{quote(name + '.zip')}"})
+
+@app.post("/api/download_selection", dependencies=[Depends(get_current_username)])
+async def download_selection(paths: List[str] = Form(...), format: str = Form("zip")):
+    """ Streams several files/folders as one archive (form POST so the browser saves it as a download). """
+    if format not in bundle.formats(): raise HTTPException(400, "Unsupported archive format")
+    items, used = [], set()
+    for path in paths:
+        real_path, st, inner = resolve_entry(path)
+        if inner is not None: raise HTTPException(400, "Files inside archives can't be bundled")
+        if not (S_ISREG(st.st_mode) or S_ISDIR(st.st_mode)): raise HTTPException(404)
+        arcname = real_path.name or "RapydShare"
+        stem, i = arcname, 1
+        while arcname in used:
+            arcname = f"{stem} ({i})"
+            i += 1
+        used.add(arcname)
+        items.append((real_path, arcname))
+    if not items: raise HTTPException(400)
+
+    base_name = items[0][1] if len(items) == 1 else f"RapydShare_{datetime.now():%Y%m%d_%H%M%S}"
+    filename = f"{base_name}.{format}"
+    media_type = "application/zstd" if format == "tar.zst" else "application/zip"
+    return StreamingResponse(bundle.stream_archive(items, format), media_type=media_type,
+                             headers={"content-disposition": f"attachment; filename*=utf-8''{quote(filename)}"})
 
 @app.get("/api/view", dependencies=[Depends(get_current_username)])
-async def view_media(path: str):
-    real_path = (Path(config.ROOT_DIR) / path).resolve()
-    if real_path.exists(): return FileResponse(real_path)
-    raise HTTPException(404)
+async def view_media(path: str, request: Request, w: int = Query(None, ge=1), v: str = None):
+    real_path, st, inner = resolve_entry(path)
+    if w and (inner is not None or S_ISREG(st.st_mode)):
+        # Screen-sized preview; the original is still served when w is omitted
+        width, fmt = rendition_bucket(w), rendition_format(request.headers.get("accept"))
+        source_key = str(real_path) if inner is None else f"{real_path}/{inner}"
+        digest = cache_digest(source_key, st, width, fmt)
+        out_path = config.THUMB_CACHE_DIR / f"r_{digest}.{fmt.lower()}"
+        headers = {"etag": f'"{digest}"', "vary": "Accept",
+                   "cache-control": "private, max-age=31536000, immutable" if v else "no-cache"}
+
+        if not_modified(request, headers["etag"]): return Response(status_code=304, headers=headers)
+        ready = out_path.exists()
+        if not ready:
+            loop = asyncio.get_event_loop()
+            if inner is not None:
+                index, member = await load_member(real_path, st, inner)
+                ready = await loop.run_in_executor(executor, member_rendition, index, member, out_path, width, fmt)
+            else:
+                f, real_path, _ = open_path(path)
+                ready = await loop.run_in_executor(executor, file_rendition, f, real_path, out_path, width, fmt)
+        if ready: return FileResponse(out_path, media_type=f"image/{fmt.lower()}", headers=headers)
+        # Not an image, or already smaller than the bucket: fall through to the original
+
+    if inner is not None:
+        index, member = await load_member(real_path, st, inner)
+        return stream_member(request, index, member)
+    if not S_ISREG(st.st_mode): raise HTTPException(404)
+    f, real_path, st = open_path(path)
+    return stream_opened(request, f, real_path, st)
 
 @app.get("/api/server_info", dependencies=[Depends(get_current_username)])
 async def server_info():
-    return {"allow_upload": bool(config.ALLOW_UPLOAD)}
+    return {"allow_upload": bool(config.ALLOW_UPLOAD), "archive_formats": bundle.formats()}
 
 @app.post("/api/upload", dependencies=[Depends(get_current_username)])
 async def upload_file(file: UploadFile = File(...)):
@@ -140,20 +375,17 @@ async def upload_file(file: UploadFile = File(...)):
     if not config.UPLOAD_DIR:
         raise HTTPException(500, "Upload directory is not configured")
 
-    upload_dir = Path(config.UPLOAD_DIR).resolve()
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    Path(config.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
     safe_name = sanitize_filename(file.filename or "")
-    target_path = resolve_unique_path(upload_dir, safe_name)
-
     try:
-        target_path.resolve().relative_to(upload_dir)
-    except ValueError:
+        fd, target_path = create_unique_file(upload_resolver, config.UPLOAD_DIR, safe_name)
+    except PermissionError:
         raise HTTPException(400, "Invalid upload path")
 
     total_written = 0
     try:
-        async with aiofiles.open(target_path, 'wb') as out:
+        async with aiofiles.open(fd, 'wb') as out:
             while True:
                 chunk = await file.read(1024 * 1024)
                 if not chunk:
@@ -162,8 +394,7 @@ async def upload_file(file: UploadFile = File(...)):
                 total_written += len(chunk)
     except Exception as e:
         try:
-            if target_path.exists():
-                target_path.unlink()
+            upload_resolver.unlink(config.UPLOAD_DIR, target_path.name)
         except Exception:
             pass
         raise HTTPException(500, f"Upload failed: {e}")
@@ -184,11 +415,115 @@ async def upload_file(file: UploadFile = File(...)):
         "saved_outside_root": saved_outside_root,
     })
 
+# --- Delta sync ---
+# target="root" addresses the shared folder, target="upload" the upload folder.
+
+def sync_base_dir(target: str) -> Path:
+    if target == "root":
+        return Path(config.ROOT_DIR).resolve()
+    if target == "upload":
+        if not config.ALLOW_UPLOAD:
+            raise HTTPException(403, "Uploads are disabled")
+        if not config.UPLOAD_DIR:
+            raise HTTPException(500, "Upload directory is not configured")
+        return Path(config.UPLOAD_DIR).resolve()
+    raise HTTPException(400, "Unknown sync target")
+
+def sync_path(target: str, path: str):
+    sync_base_dir(target)
+    if target == "upload":
+        return resolve_path(path, upload_resolver, config.UPLOAD_DIR)
+    return resolve_path(path)
+
+@app.get("/api/sync/manifest", dependencies=[Depends(get_current_username)])
+async def sync_manifest(path: str = "", target: str = "root", hashes: bool = True):
+    base = sync_base_dir(target)
+    real_path, st = sync_path(target, path)
+    if not S_ISDIR(st.st_mode): raise HTTPException(404)
+    rel = real_path.relative_to(base).as_posix()
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, sync.build_manifest, base, "" if rel == "." else rel, hashes)
+
+@app.get("/api/sync/signature", dependencies=[Depends(get_current_username)])
+async def sync_signature(path: str, target: str = "root", block_size: int = 0):
+    if block_size and not sync.valid_block_size(block_size):
+        raise HTTPException(400, "Unsupported block size")
+    real_path, st = sync_path(target, path)
+    if not S_ISREG(st.st_mode): raise HTTPException(404)
+    return StreamingResponse(sync.iter_signature(real_path, block_size), media_type="application/octet-stream")
+
+@app.post("/api/sync/delta", dependencies=[Depends(get_current_username)])
+async def sync_delta(path: str, request: Request):
+    """ Body is the client's signature of its stale copy; responds with the delta to bring it up to date. """
+    real_path, st = sync_path("root", path)
+    if not S_ISREG(st.st_mode): raise HTTPException(404)
+    try:
+        block_size, table = sync.parse_signature(await request.body())
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return StreamingResponse(sync.iter_delta(real_path, block_size, table), media_type="application/octet-stream")
+
+def _apply_upload_delta(rel: str, delta_path: Path, mtime):
+    # Everything goes through upload_resolver. The new copy is built in the upload folder itself
+    # and only moved into place (creating its folders) once the delta has checked out.
+    root = config.UPLOAD_DIR
+    tmp_rel = f".sync_{secrets.token_hex(8)}"
+    fd, tmp_path = upload_resolver.create(root, tmp_rel)
+    try:
+        try:
+            base = upload_resolver.open(root, rel)[0]
+        except FileNotFoundError:
+            base = None
+        with os.fdopen(fd, 'wb') as out, open(delta_path, 'rb') as delta:
+            try:
+                digest = sync.apply_delta(base, delta, out)
+            finally:
+                if base: base.close()
+            if mtime is not None:
+                out.flush()
+                os.utime(out.fileno() if os.utime in os.supports_fd else tmp_path, (mtime, mtime))
+        upload_resolver.makedirs(root, posixpath.dirname(rel))
+        upload_resolver.replace(root, tmp_rel, rel)
+        return digest
+    except BaseException:
+        try: upload_resolver.unlink(root, tmp_rel)
+        except OSError: pass
+        raise
+
+@app.post("/api/sync/patch", dependencies=[Depends(get_current_username)])
+async def sync_patch(path: str, request: Request, mtime: float = None):
+    """ Body is a delta against the upload folder's copy (see /api/sync/signature?target=upload). """
+    sync_base_dir("upload")
+    parts = [p for p in path.replace('\\', '/').split('/') if p not in ("", ".")]
+    if not parts or ".." in parts: raise HTTPException(400, "Invalid upload path")
+    rel = "/".join(sanitize_filename(p) for p in parts)
+
+    delta_path = config.THUMB_CACHE_DIR / f"delta_{secrets.token_hex(8)}"
+    try:
+        async with aiofiles.open(delta_path, 'wb') as out:
+            async for chunk in request.stream():
+                await out.write(chunk)
+        loop = asyncio.get_event_loop()
+        digest = await loop.run_in_executor(executor, _apply_upload_delta, rel, delta_path, mtime)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    except (PermissionError, FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise HTTPException(400, "Invalid upload path")
+    finally:
+        try: delta_path.unlink()
+        except OSError: pass
+
+    _, st = resolve_path(rel, upload_resolver, config.UPLOAD_DIR)
+    return {"path": rel, "size": st.st_size, "sha256": digest}
+
 if os.path.exists(config.FRONTEND_DIST_DIR):
     app.mount("/", StaticFiles(directory=config.FRONTEND_DIST_DIR, html=True), name="static")
 
 def run_server():
     global global_server
+    root_resolver.clear()
+    upload_resolver.clear()
+    if config.PREWARM_THUMBS: prewarmer.start(config.ROOT_DIR)
     log_config = uvicorn.config.LOGGING_CONFIG
     log_config["handlers"]["default"]["stream"] = "ext://sys.stderr"
     log_config["handlers"]["access"]["stream"] = "ext://sys.stdout"
@@ -199,5 +534,6 @@ def run_server():
 
 def stop_server_logic():
     global global_server
+    prewarmer.stop()
     if global_server:
         global_server.should_exit = True
\ No newline at end of file
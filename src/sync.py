@@ -0,0 +1,316 @@
+import os
+import struct
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from math import isqrt
+from pathlib import Path
+
+# rsync-style delta transfer.
+#
+# Signature:  b"RSS1" | u32 block_size | (u32 weak | 16 byte strong) * n
+# Delta:      b"RSD1" | u32 block_size | ops... | OP_END | 32 byte sha256 of the result
+#   OP_COPY  u32 first_block | u32 block_count   (blocks taken from the receiver's copy)
+#   OP_DATA  u32 length | raw bytes             (literal bytes the receiver is missing)
+#
+# The weak checksum is adler32 so aligned blocks are hashed in C by zlib and only
+# mismatching regions fall back to rolling the window one byte at a time. After
+# ROLL_LIMIT block lengths without a match only a short stretch of every block length
+# is rolled before jumping a block ahead. Each stretch starts at the next offset within
+# the block, so data shifted by an insert or delete lines up again within about
+# PROBE_STEPS blocks while a rewritten file is rolled through only 1/PROBE_STEPS.
+
+SIG_MAGIC = b"RSS1"
+DELTA_MAGIC = b"RSD1"
+OP_END = 0
+OP_COPY = 1
+OP_DATA = 2
+
+MIN_BLOCK_SIZE = 2 * 1024
+MAX_BLOCK_SIZE = 1024 * 1024
+READ_SIZE = 4 * 1024 * 1024
+MAX_LITERAL = 1024 * 1024
+STRONG_SIZE = 16
+HASH_CACHE_SIZE = 100_000
+ROLL_LIMIT = 8     # block lengths rolled byte by byte without a match before skipping ahead
+PROBE_STEPS = 16   # after that, roll 1/PROBE_STEPS of each block length and skip the rest
+
+_ADLER_MOD = 65521
+_HEADER = struct.Struct(">4sI")
+_SIG_ENTRY = struct.Struct(f">I{STRONG_SIZE}s")
+_OP = struct.Struct(">B")
+_U32 = struct.Struct(">I")
+_COPY = struct.Struct(">II")
+
+def block_size_for(size: int) -> int:
+    """ Square-root block size (like rsync), rounded up to 1 KB and clamped. """
+    block = (isqrt(max(size, 0)) + 1023) // 1024 * 1024
+    return max(MIN_BLOCK_SIZE, min(MAX_BLOCK_SIZE, block))
+
+def valid_block_size(block_size: int) -> bool:
+    """ Block sizes a signature may use (0 = pick automatically). """
+    return MIN_BLOCK_SIZE // 4 <= block_size <= MAX_BLOCK_SIZE * 4
+
+def _strong(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=STRONG_SIZE).digest()
+
+# --- Manifest ---
+
+_hash_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_hash_lock = threading.Lock()
+
+def file_digest(path: Path, st: os.stat_result = None) -> str:
+    """ sha256 of a file, cached by (size, mtime) so unchanged files are never re-read. """
+    st = st or path.stat()
+    key = str(path)
+    with _hash_lock:
+        cached = _hash_cache.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            _hash_cache.move_to_end(key)
+            return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(READ_SIZE):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _hash_lock:
+        _hash_cache[key] = (st.st_size, st.st_mtime_ns, digest)
+        _hash_cache.move_to_end(key)
+        while len(_hash_cache) > HASH_CACHE_SIZE:
+            _hash_cache.popitem(last=False)
+    return digest
+
+def build_manifest(base: Path, rel: str, with_hashes: bool = True) -> dict:
+    """ Walks base/rel without following symlinks. Paths are relative to base. """
+    start = base / rel
+    dirs, files = [], []
+    stack = [start]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_symlink(): continue
+                        entry_rel = Path(entry.path).relative_to(base).as_posix()
+                        if entry.is_dir():
+                            dirs.append(entry_rel)
+                            stack.append(Path(entry.path))
+                        elif entry.is_file():
+                            st = entry.stat()
+                            item = {"path": entry_rel, "size": st.st_size, "mtime": st.st_mtime}
+                            if with_hashes:
+                                item["sha256"] = file_digest(Path(entry.path), st)
+                            files.append(item)
+                    except OSError: continue
+        except OSError: continue
+    dirs.sort()
+    files.sort(key=lambda f: f["path"])
+    return {"path": rel, "dirs": dirs, "files": files}
+
+# --- Signatures ---
+
+def iter_signature(path: Path, block_size: int = 0):
+    """ Yields the binary signature of a file in READ_SIZE-ish pieces. """
+    if not block_size:
+        block_size = block_size_for(path.stat().st_size)
+    elif not valid_block_size(block_size):
+        raise ValueError("Unsupported block size")
+    yield _HEADER.pack(SIG_MAGIC, block_size)
+    with open(path, 'rb') as f:
+        out = bytearray()
+        while block := f.read(block_size):
+            out += _SIG_ENTRY.pack(zlib.adler32(block), _strong(block))
+            if len(out) >= READ_SIZE:
+                yield bytes(out)
+                out.clear()
+        if out:
+            yield bytes(out)
+
+def parse_signature(data: bytes):
+    """ Returns (block_size, {weak: {strong: block_index}}). """
+    if len(data) < _HEADER.size:
+        raise ValueError("Signature is truncated")
+    magic, block_size = _HEADER.unpack_from(data)
+    if magic != SIG_MAGIC:
+        raise ValueError("Not a signature")
+    if not valid_block_size(block_size):
+        raise ValueError("Unsupported block size")
+    body = memoryview(data)[_HEADER.size:]
+    if len(body) % _SIG_ENTRY.size:
+        raise ValueError("Signature is truncated")
+    table = {}
+    for index, (weak, strong) in enumerate(_SIG_ENTRY.iter_unpack(body)):
+        table.setdefault(weak, {}).setdefault(strong, index)
+    return block_size, table
+
+# --- Delta generation ---
+
+def _iter_ops(f, block_size: int, table: dict, digest):
+    """ Yields ('copy', index) / ('data', bytes) for the contents of f. """
+    if not table:
+        # Receiver has nothing to reuse; don't bother rolling.
+        while chunk := f.read(MAX_LITERAL):
+            digest.update(chunk)
+            yield ('data', chunk)
+        return
+
+    buf = bytearray()
+    start = 0          # window start inside buf
+    lit = 0            # start of the pending literal inside buf
+    weak = None        # adler32 of buf[start:start + block_size] once known
+    rolled = 0         # bytes rolled since the last match
+    probed = 0         # bytes rolled since the last jump
+    eof = False
+
+    while True:
+        if len(buf) - start <= block_size and not eof:
+            if lit:
+                del buf[:lit]
+                start -= lit
+                lit = 0
+            chunk = f.read(READ_SIZE)
+            if chunk:
+                digest.update(chunk)
+                buf += chunk
+            else:
+                eof = True
+            continue
+
+        remaining = len(buf) - start
+        if remaining <= 0:
+            break
+
+        if remaining < block_size:
+            # Only the short final block can still match.
+            tail = bytes(buf[start:])
+            candidates = table.get(zlib.adler32(tail))
+            index = candidates.get(_strong(tail)) if candidates else None
+            if index is not None:
+                if start > lit: yield ('data', bytes(buf[lit:start]))
+                yield ('copy', index)
+            else:
+                yield ('data', bytes(buf[lit:]))
+            return
+
+        if weak is None:
+            weak = zlib.adler32(buf[start:start + block_size])
+
+        candidates = table.get(weak)
+        if candidates:
+            index = candidates.get(_strong(buf[start:start + block_size]))
+            if index is not None:
+                if start > lit: yield ('data', bytes(buf[lit:start]))
+                yield ('copy', index)
+                start += block_size
+                lit = start
+                weak = None
+                rolled = probed = 0
+                continue
+
+        if rolled >= ROLL_LIMIT * block_size and probed >= block_size // PROBE_STEPS:
+            # Long miss: skip a block, then roll the next stretch.
+            start += block_size
+            weak = None
+            probed = 0
+        elif start + block_size >= len(buf):
+            weak = None
+            start += 1
+            rolled += 1
+            probed += 1
+        else:
+            # Roll the window forward by one byte.
+            out_byte, in_byte = buf[start], buf[start + block_size]
+            a = ((weak & 0xFFFF) - out_byte + in_byte) % _ADLER_MOD
+            b = ((weak >> 16) - block_size * out_byte + a - 1) % _ADLER_MOD
+            weak = (b << 16) | a
+            start += 1
+            rolled += 1
+            probed += 1
+        if start - lit >= MAX_LITERAL:
+            yield ('data', bytes(buf[lit:start]))
+            lit = start
+
+    if len(buf) > lit:
+        yield ('data', bytes(buf[lit:]))
+
+def iter_delta(path: Path, block_size: int, table: dict):
+    """ Yields the binary delta that turns the signed file into `path`. """
+    digest = hashlib.sha256()
+    yield _HEADER.pack(DELTA_MAGIC, block_size)
+    run_start, run_len = None, 0
+    out = bytearray()
+    with open(path, 'rb') as f:
+        for kind, value in _iter_ops(f, block_size, table, digest):
+            if kind == 'copy':
+                if run_start is not None and value == run_start + run_len:
+                    run_len += 1
+                    continue
+                if run_start is not None:
+                    out += _OP.pack(OP_COPY) + _COPY.pack(run_start, run_len)
+                run_start, run_len = value, 1
+            else:
+                if not value: continue
+                if run_start is not None:
+                    out += _OP.pack(OP_COPY) + _COPY.pack(run_start, run_len)
+                    run_start, run_len = None, 0
+                out += _OP.pack(OP_DATA) + _U32.pack(len(value)) + value
+            if len(out) >= READ_SIZE:
+                yield bytes(out)
+                out.clear()
+    if run_start is not None:
+        out += _OP.pack(OP_COPY) + _COPY.pack(run_start, run_len)
+    out += _OP.pack(OP_END) + digest.digest()
+    yield bytes(out)
+
+# --- Delta application ---
+
+def _read_exact(f, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Delta is truncated")
+    return data
+
+def apply_delta(base, delta, out) -> str:
+    """
+    Rebuilds a file from the receiver's copy `base` (an open file object, or None if
+    missing) and a delta read from the file object `delta`, writing to the file object
+    `out`. Returns the sha256 hex digest, raising ValueError if it doesn't match the delta.
+    """
+    magic, block_size = _HEADER.unpack(_read_exact(delta, _HEADER.size))
+    if magic != DELTA_MAGIC:
+        raise ValueError("Not a delta")
+    digest = hashlib.sha256()
+    while True:
+        op, = _OP.unpack(_read_exact(delta, _OP.size))
+        if op == OP_END:
+            expected = _read_exact(delta, 32)
+            break
+        if op == OP_COPY:
+            first, count = _COPY.unpack(_read_exact(delta, _COPY.size))
+            if base is None:
+                raise ValueError("Delta references a missing base file")
+            base.seek(first * block_size)
+            left = count * block_size
+            while left > 0:
+                data = base.read(min(left, READ_SIZE))
+                if not data: break
+                out.write(data)
+                digest.update(data)
+                left -= len(data)
+        elif op == OP_DATA:
+            length, = _U32.unpack(_read_exact(delta, _U32.size))
+            while length > 0:
+                data = _read_exact(delta, min(length, READ_SIZE))
+                out.write(data)
+                digest.update(data)
+                length -= len(data)
+        else:
+            raise ValueError(f"Unknown delta op {op}")
+
+    if digest.digest() != expected:
+        raise ValueError("Checksum mismatch after applying delta")
+    return digest.hexdigest()
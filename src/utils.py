@@ -2,8 +2,10 @@ import os
 import sys
 import mimetypes
 import socket
+import hashlib
+import threading
 import cv2
-from PIL import Image
+from PIL import Image, ImageOps, features
 from pathlib import Path
 # --- Added these new imports ---
 import qrcode
@@ -50,19 +52,66 @@ def generate_qr_code_pixmap(url: str, size: int = 220) -> QPixmap:
     # Scale the pixmap to the desired size
     return pixmap.scaled(size, size)
 
-def generate_thumbnail(file_path: Path, thumb_path: Path):
+def cache_digest(source_key: str, st, *extra) -> str:
+    """ Cache file name for a derivative of source_key; changes whenever the source's size or mtime does. """
+    parts = [source_key, str(st.st_size), str(st.st_mtime_ns), *map(str, extra)]
+    return hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
+def _save_atomic(img, out_path: Path, fmt: str, **params):
+    # Readers (and other writers) must never see a half-written cache file
+    tmp_path = out_path.with_name(out_path.name + f".{threading.get_ident()}.tmp")
+    try:
+        img.save(tmp_path, fmt, **params)
+        os.replace(tmp_path, out_path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+
+# Display-size preview widths; requests are rounded up to the next bucket
+RENDITION_WIDTHS = (640, 1280, 1920, 2560)
+# Formats browsers can't resize for us cheaply or that would lose animation
+RENDITION_SKIP = {"image/gif", "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon"}
+
+def rendition_bucket(width: int) -> int:
+    return next((w for w in RENDITION_WIDTHS if w >= width), RENDITION_WIDTHS[-1])
+
+def rendition_format(accept: str) -> str:
+    return "WEBP" if "image/webp" in (accept or "") and features.check("webp") else "JPEG"
+
+def generate_rendition(file_path: Path, out_path: Path, width: int, fmt: str = "JPEG", source=None):
+    """ Screen-sized copy of an image. Returns False if the original is already small enough. """
+    try:
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if not mime_type or not mime_type.startswith('image') or mime_type in RENDITION_SKIP: return False
+
+        with Image.open(source or file_path) as img:
+            if img.width <= width: return False
+            # Let the JPEG decoder downscale by 1/2, 1/4, 1/8 while decoding
+            img.draft("RGB", (width, img.height * width // img.width))
+            img = ImageOps.exif_transpose(img)
+            if fmt == "JPEG" and img.mode != "RGB": img = img.convert("RGB")
+            elif img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA")
+            img.thumbnail((width, width * 4), Image.LANCZOS)
+            _save_atomic(img, out_path, fmt, quality=80)
+            return True
+    except:
+        return False
+
+def generate_thumbnail(file_path: Path, thumb_path: Path, source=None):
+    # `source` is an optional open file object (e.g. an archive member) read instead of file_path
     try:
         mime_type, _ = mimetypes.guess_type(file_path)
         if not mime_type: return False
 
         if mime_type.startswith('image'):
-            with Image.open(file_path) as img:
+            with Image.open(source or file_path) as img:
                 if img.mode in ("RGBA", "P"): img = img.convert("RGB")
                 img.thumbnail((300, 300))
-                img.save(thumb_path, "JPEG", quality=60)
+                _save_atomic(img, thumb_path, "JPEG", quality=60)
                 return True
 
         elif mime_type.startswith('video'):
+            # OpenCV needs a real file on disk
+            if source is not None: return False
             cap = cv2.VideoCapture(str(file_path))
             if not cap.isOpened(): return False
             # Jump to 33%
@@ -75,7 +124,7 @@ def generate_thumbnail(file_path: Path, thumb_path: Path):
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 img = Image.fromarray(frame)
                 img.thumbnail((300, 300))
-                img.save(thumb_path, "JPEG", quality=60)
+                _save_atomic(img, thumb_path, "JPEG", quality=60)
                 return True
     except: return False
     return False
\ No newline at end of file